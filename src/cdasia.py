@@ -9,6 +9,7 @@ from loguru import logger
 from tenacity import retry, stop_after_attempt, wait_fixed
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
 
+from .preflight import PreflightError, check_page, log_report
 from .selectors import SEL
 
 class CDAsiaClient:
@@ -37,11 +38,21 @@ class CDAsiaClient:
         logger.debug(f"Navigating to {url}")
         await self.page.goto(url, timeout=self.cfg["scrape"]["navigation_timeout_ms"])
 
+    async def preflight(self, page_type: str) -> None:
+        """Fail fast if selectors for ``page_type`` are missing, instead of waiting out timeouts."""
+        if not self.cfg["scrape"].get("preflight", True):
+            return
+        report = await check_page(self.page, page_type, self.cfg)
+        if not report["ok"]:
+            log_report(report)
+            raise PreflightError(report)
+
     async def login(
         self,
         human_checkpoint: bool = True,
         username: Optional[str] = None,
         password: Optional[str] = None,
+        preflight: bool = True,
     ):
         load_dotenv()
 
@@ -63,6 +74,8 @@ class CDAsiaClient:
             )
 
         await self.goto(self.cfg["site"]["base_url"] + self.cfg["site"]["login_path"])
+        if preflight:
+            await self.preflight("login")
         await self.page.fill(SEL["login_user"], user)
         await asyncio.sleep(0.5)
         await self.page.fill(SEL["login_pass"], pwd)
@@ -91,6 +104,7 @@ class CDAsiaClient:
     async def search(self) -> List[Dict]:
         url = self.cfg["site"]["base_url"] + self.cfg["site"]["search_path"]
         await self.goto(url)
+        await self.preflight("search")
 
         throttle = self.cfg["scrape"]["throttle_ms"] / 1000
 
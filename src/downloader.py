@@ -1,12 +1,30 @@
 import asyncio
 import hashlib
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional
 
-import pandas as pd
 from loguru import logger
 
+from .failures import (
+    AUTH_EXPIRED,
+    DEAD_LETTER_FILE,
+    NAVIGATION,
+    NO_DOWNLOAD,
+    TIMEOUT,
+    DeadLetterQueue,
+    DocumentFetchError,
+    backoff_delay,
+    classify_error,
+)
+from .ledger import LeaseLost
 from .selectors import SEL
+from .tracing import OutlierTracer
+
+# Longest a ledger worker sleeps between polls when nothing is claimable.
+LEDGER_POLL_S = 5
+
 
 class Downloader:
     def __init__(self, cfg: dict, base_dir: Path):
@@ -17,9 +35,14 @@ class Downloader:
         self.index_path = self.base_dir / "index.csv"
         self._existing_index: Dict[str, Dict] = {}
         self._existing_rows: List[Dict] = []
+        self.dead_letters = DeadLetterQueue(self.base_dir / DEAD_LETTER_FILE)
+        self.failures: Dict[str, Dict] = {}
+        self.tracer = OutlierTracer(self.cfg, Path(self.cfg["site"]["log_dir"]) / "traces")
 
         if self.resume_enabled and self.index_path.exists():
             try:
+                import pandas as pd
+
                 existing_df = pd.read_csv(self.index_path)
                 self._existing_rows = existing_df.to_dict("records")
                 for row in self._existing_rows:
@@ -52,18 +75,30 @@ class Downloader:
                     return False
 
         tab = await page.context.new_page()
-        await tab.goto(url, timeout=self.cfg["scrape"]["navigation_timeout_ms"])
-        await asyncio.sleep(self.cfg["scrape"]["throttle_ms"]/1000)
+        try:
+            try:
+                await tab.goto(url, timeout=self.cfg["scrape"]["navigation_timeout_ms"])
+            except Exception as exc:
+                kind = TIMEOUT if classify_error(exc) == TIMEOUT else NAVIGATION
+                raise DocumentFetchError(kind, f"Could not open detail page: {exc}") from exc
+            login_path = self.cfg["site"].get("login_path")
+            if login_path and login_path != "/" and login_path in tab.url:
+                raise DocumentFetchError(AUTH_EXPIRED, "Redirected to login; session expired")
+            await asyncio.sleep(self.cfg["scrape"]["throttle_ms"]/1000)
 
-        title = (item["title"] or "document").replace("/", "-").strip()
-        year = str(item.get("date_parsed").year) if item.get("date_parsed") else "undated"
-        folder = self.base_dir / year
-        folder.mkdir(parents=True, exist_ok=True)
+            title = (item["title"] or "document").replace("/", "-").strip()
+            year = str(item.get("date_parsed").year) if item.get("date_parsed") else "undated"
+            folder = self.base_dir / year
+            folder.mkdir(parents=True, exist_ok=True)
 
-        try:
-            async with tab.expect_download(timeout=self.cfg["scrape"]["download_timeout_ms"]) as dlf:
-                await tab.click(SEL["download_link"])
-            download = await dlf.value
+            try:
+                async with tab.expect_download(timeout=self.cfg["scrape"]["download_timeout_ms"]) as dlf:
+                    await tab.click(SEL["download_link"])
+                download = await dlf.value
+            except Exception as exc:
+                if classify_error(exc) == TIMEOUT:
+                    raise DocumentFetchError(NO_DOWNLOAD, f"No download event: {exc}") from exc
+                raise
             out_path = folder / f"{title}.pdf"
             await download.save_as(str(out_path))
 
@@ -75,6 +110,8 @@ class Downloader:
                 "url": url,
                 "file": str(out_path),
                 "sha256": sha256,
+                "division": self.cfg.get("filters", {}).get("division"),
+                "downloaded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
             }
             self.index_rows.append(row)
             if record_key and self.resume_enabled:
@@ -83,21 +120,93 @@ class Downloader:
             await tab.close()
         return True
 
-    async def fetch_all(self, page, results: List[Dict]):
-        for i, item in enumerate(results, 1):
-            try:
+    async def _attempt(self, page, item: Dict, label: str) -> bool:
+        """Fetch one item, recording a classified failure instead of raising."""
+        key = item.get("href") or item.get("title") or label
+        try:
+            async with self.tracer.capture(page.context, item.get("title") or key) as op:
                 downloaded = await self.fetch_one(page, item)
-                if downloaded:
-                    logger.info(f"Downloaded {i}/{len(results)}: {item['title']}")
-                else:
-                    logger.info(f"Skipped {i}/{len(results)}: {item['title']}")
-            except Exception as e:
-                logger.error(f"Failed {item.get('title','(untitled)')}: {e}")
+                op.sampled = downloaded
+        except Exception as e:
+            kind = classify_error(e)
+            entry = self.failures.setdefault(key, {"item": item, "attempts": 0})
+            entry.update({"kind": kind, "error": str(e)})
+            entry["attempts"] += 1
+            logger.error(f"Failed {label} [{kind}] {item.get('title','(untitled)')}: {e}")
+            return False
+        self.failures.pop(key, None)
+        self.dead_letters.discard(item)
+        if downloaded:
+            logger.info(f"Downloaded {label}: {item['title']}")
+        else:
+            logger.info(f"Skipped {label}: {item['title']}")
+        return True
+
+    async def _retry_failures(
+        self,
+        page,
+        reauth: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> None:
+        scrape = self.cfg["scrape"]
+        retries = int(scrape.get("retries", 0))
+        base_s = scrape.get("retry_backoff_ms", 2000) / 1000
+        max_s = scrape.get("retry_backoff_max_ms", 60000) / 1000
+
+        for attempt in range(retries):
+            if not self.failures:
+                return
+            pending = list(self.failures.values())
+            if reauth and any(entry["kind"] == AUTH_EXPIRED for entry in pending):
+                logger.info("Session expired during run; logging in again before retrying.")
+                try:
+                    await reauth()
+                except Exception as exc:
+                    logger.error(f"Re-login failed; leaving {len(pending)} failures for later: {exc}")
+                    return
+            delay = backoff_delay(attempt, base_s, max_s)
+            logger.info(
+                f"Retry round {attempt + 1}/{retries} for {len(pending)} failed documents in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+            for i, entry in enumerate(pending, 1):
+                await self._attempt(page, entry["item"], f"retry {attempt + 1}.{i}/{len(pending)}")
+                await asyncio.sleep(scrape["throttle_ms"]/1000)
+
+    async def fetch_all(
+        self,
+        page,
+        results: List[Dict],
+        reauth: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        for i, item in enumerate(results, 1):
+            await self._attempt(page, item, f"{i}/{len(results)}")
             await asyncio.sleep(self.cfg["scrape"]["throttle_ms"]/1000)
 
+        await self._retry_failures(page, reauth)
+
+        for entry in self.failures.values():
+            self.dead_letters.add(entry["item"], entry["kind"], entry["error"], entry["attempts"])
+        if self.failures:
+            logger.warning(
+                f"{len(self.failures)} documents still failing; recorded in {self.dead_letters.path}"
+            )
+        self.dead_letters.save()
+
+        self.write_index()
+
+    def write_index(self, fresh: bool = False) -> None:
+        """Merge this run's rows into index.csv.
+
+        With ``fresh`` the existing index is re-read from disk first, so rows
+        written meanwhile by other workers are kept.
+        """
         out_csv = Path(self.cfg["site"]["downloads_subdir"]) / "index.csv"
+        import pandas as pd
+
         all_rows: List[Dict] = []
-        if self.resume_enabled:
+        if fresh and out_csv.exists():
+            all_rows.extend(pd.read_csv(out_csv).to_dict("records"))
+        elif self.resume_enabled:
             all_rows.extend(self._existing_rows)
         all_rows.extend(self.index_rows)
 
@@ -108,5 +217,99 @@ class Downloader:
         df = pd.DataFrame(all_rows)
         if "url" in df.columns:
             df = df.drop_duplicates(subset=["url"], keep="last")
-        df.to_csv(out_csv, index=False)
+        tmp_csv = out_csv.with_suffix(".csv.tmp")
+        df.to_csv(tmp_csv, index=False)
+        tmp_csv.replace(out_csv)
         logger.success(f"Saved index to {out_csv}")
+
+    async def _heartbeat(self, ledger, claimed: List[str]) -> None:
+        while True:
+            await asyncio.sleep(ledger.lease_s / 3)
+            try:
+                await asyncio.to_thread(ledger.heartbeat, list(claimed))
+            except Exception as exc:  # pragma: no cover - defensive logging
+                logger.warning(f"Ledger heartbeat failed: {exc}")
+
+    async def work_ledger(
+        self,
+        page,
+        ledger,
+        reauth: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        """Claim and download items from a shared WorkLedger until none are left."""
+        scrape = self.cfg["scrape"]
+        max_attempts = int(scrape.get("retries", 0)) + 1
+        backoff_s = scrape.get("retry_backoff_ms", 2000) / 1000
+        backoff_max_s = scrape.get("retry_backoff_max_ms", 60000) / 1000
+
+        claimed: List[str] = []
+        heartbeat = asyncio.create_task(self._heartbeat(ledger, claimed))
+        processed = 0
+        try:
+            while True:
+                batch = await asyncio.to_thread(ledger.claim, 1)
+                if not batch:
+                    retry_at = await asyncio.to_thread(ledger.next_retry_at)
+                    if retry_at is None:
+                        break
+                    # Other workers keep renewing their leases, so re-poll often
+                    # rather than sleeping until the earliest one expires.
+                    wait = min(max(retry_at - time.time(), 0), ledger.lease_s / 3, LEDGER_POLL_S)
+                    await asyncio.sleep(wait + 0.1)
+                    continue
+                item = batch[0]
+                claimed[:] = [item["href"]]
+                processed += 1
+                label = f"{processed} [{ledger.worker_id}]"
+                if await self._attempt(page, item, label):
+                    last = self.index_rows[-1] if self.index_rows else {}
+                    file = last.get("file") if last.get("url") == item["href"] else None
+                    # The index row is merged in the same ledger transaction that
+                    # marks the item done, so a done item is never missing from
+                    # index.csv even if this worker stops right afterwards.
+                    try:
+                        await asyncio.to_thread(
+                            ledger.complete, item["href"], file,
+                            (lambda: self.write_index(fresh=True)) if file else None,
+                        )
+                    except LeaseLost:
+                        logger.warning(f"Lease on {item.get('title', '(untitled)')} expired; another worker owns it now")
+                else:
+                    entry = self.failures.pop(item["href"])
+                    try:
+                        dead = await asyncio.to_thread(
+                            ledger.fail, item["href"], entry["kind"], entry["error"],
+                            max_attempts, backoff_s, backoff_max_s,
+                        )
+                    except LeaseLost:
+                        logger.warning(f"Lease on {item.get('title', '(untitled)')} expired; dropping this failure")
+                        dead = False
+                    if dead:
+                        logger.warning(f"Giving up on {item.get('title', '(untitled)')} after {max_attempts} attempts")
+                    if entry["kind"] == AUTH_EXPIRED and reauth:
+                        logger.info("Session expired; logging in again.")
+                        try:
+                            await reauth()
+                        except Exception as exc:
+                            logger.error(f"Re-login failed; stopping this worker: {exc}")
+                            break
+                claimed.clear()
+                await asyncio.sleep(scrape["throttle_ms"]/1000)
+        finally:
+            heartbeat.cancel()
+            await asyncio.to_thread(ledger.release)
+
+        logger.info(f"Worker {ledger.worker_id} processed {processed} items; ledger: {ledger.stats()}")
+
+    async def retry_failed(
+        self,
+        page,
+        reauth: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        """Process only the documents recorded in the dead-letter queue."""
+        items = self.dead_letters.items()
+        if not items:
+            logger.info(f"No failed documents recorded in {self.dead_letters.path}")
+            return
+        logger.info(f"Retrying {len(items)} documents from {self.dead_letters.path}")
+        await self.fetch_all(page, items, reauth)
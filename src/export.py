@@ -0,0 +1,237 @@
+import csv
+import hashlib
+import io
+import tarfile
+import zipfile
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from loguru import logger
+
+CHUNK_SIZE = 1024 * 1024
+
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_FIELDS = ["path", "reference", "title", "date", "url", "division", "downloaded_at", "size", "sha256"]
+
+
+def _added_at(row: Dict, path: Path) -> Optional[datetime]:
+    value = row.get("downloaded_at")
+    if value:
+        try:
+            parsed = datetime.fromisoformat(value)
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    try:
+        return datetime.fromtimestamp(path.stat().st_mtime, tz=timezone.utc)
+    except OSError:
+        return None
+
+
+def select_documents(
+    downloads_dir: Path,
+    years: Optional[Sequence[str]] = None,
+    division: Optional[str] = None,
+    references: Optional[Sequence[str]] = None,
+    since: Optional[date] = None,
+) -> List[Dict]:
+    """Rows of ``index.csv`` whose files exist and match every given filter."""
+    index_path = downloads_dir / "index.csv"
+    if not index_path.exists():
+        return []
+
+    wanted_years = {str(y) for y in years} if years else None
+    wanted_refs = {r.strip() for r in references} if references else None
+    since_dt = datetime.combine(since, datetime.min.time(), tzinfo=timezone.utc) if since else None
+
+    # fetch_one names files after the title, so a later document can overwrite
+    # an earlier one at the same path; the last index row describes the file.
+    latest: Dict[str, Dict] = {}
+    with index_path.open(newline="") as fh:
+        for row in csv.DictReader(fh):
+            if row.get("file"):
+                latest.pop(row["file"], None)
+                latest[row["file"]] = row
+
+    selected = []
+    for file, row in latest.items():
+        path = Path(file)
+        if not path.is_file():
+            continue
+        if wanted_years is not None and path.parent.name not in wanted_years:
+            continue
+        if division and (row.get("division") or "") != division:
+            continue
+        if wanted_refs is not None and (row.get("reference") or "").strip() not in wanted_refs:
+            continue
+        if since_dt is not None:
+            added = _added_at(row, path)
+            if added is None or added < since_dt:
+                continue
+        try:
+            arcname = path.relative_to(downloads_dir).as_posix()
+        except ValueError:
+            arcname = f"{path.parent.name}/{path.name}"
+        selected.append({**row, "path": arcname, "_file": path, "size": path.stat().st_size})
+    return selected
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(documents: Iterable[Dict]) -> bytes:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=MANIFEST_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for doc in documents:
+        # select_documents keeps the latest index row per file, so its hash
+        # describes the bytes on disk; only rows without one are read here.
+        if not doc.get("sha256"):
+            doc["sha256"] = _sha256(doc["_file"])
+        writer.writerow(doc)
+    return buf.getvalue().encode("utf-8")
+
+
+def _read_range(path: Path, offset: int, length: int) -> Iterator[bytes]:
+    with path.open("rb") as fh:
+        fh.seek(offset)
+        remaining = length
+        while remaining > 0:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                # File shrank since the layout was computed; keep offsets valid.
+                logger.warning(f"{path} changed during export; padding with zeros")
+                chunk = b"\0" * min(CHUNK_SIZE, remaining)
+            remaining -= len(chunk)
+            yield chunk
+
+
+Segment = Tuple[int, int, Union[bytes, Path]]
+
+
+class TarExport:
+    """Precomputed uncompressed tar layout, so any byte range can be served.
+
+    Headers are built up front with the files' stat data; file bodies are read
+    from disk only while streaming. The same filters therefore produce the same
+    bytes as long as the files are unchanged, which lets clients resume with
+    HTTP range requests.
+    """
+
+    def __init__(self, documents: List[Dict], manifest: bytes):
+        self.segments: List[Segment] = []
+        offset = 0
+        mtime = int(max((d["_file"].stat().st_mtime for d in documents), default=0))
+        entries: List[Tuple[str, int, int, Union[bytes, Path]]] = [(MANIFEST_NAME, len(manifest), mtime, manifest)]
+        entries += [(d["path"], d["size"], int(d["_file"].stat().st_mtime), d["_file"]) for d in documents]
+
+        for name, size, entry_mtime, source in entries:
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = entry_mtime
+            info.mode = 0o644
+            header = info.tobuf(format=tarfile.PAX_FORMAT, encoding="utf-8", errors="surrogateescape")
+            self.segments.append((offset, len(header), header))
+            offset += len(header)
+            self.segments.append((offset, size, source))
+            offset += size
+            padding = -size % tarfile.BLOCKSIZE
+            if padding:
+                self.segments.append((offset, padding, b"\0" * padding))
+                offset += padding
+
+        trailer = b"\0" * (tarfile.BLOCKSIZE * 2)
+        self.segments.append((offset, len(trailer), trailer))
+        offset += len(trailer)
+        self.size = offset
+
+        digest = hashlib.sha256(manifest)
+        for name, size, entry_mtime, _ in entries:
+            digest.update(f"{name}:{size}:{entry_mtime}".encode())
+        self.etag = f'"{digest.hexdigest()[:32]}"'
+
+    def stream(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        end = self.size - 1 if end is None else end
+        for seg_start, length, data in self.segments:
+            seg_end = seg_start + length - 1
+            if seg_end < start or seg_start > end:
+                continue
+            lo = max(start, seg_start) - seg_start
+            hi = min(end, seg_end) - seg_start + 1
+            if isinstance(data, Path):
+                yield from _read_range(data, lo, hi - lo)
+            else:
+                yield data[lo:hi]
+
+
+class _ChunkSink:
+    """Write-only file object; ``zipfile`` treats it as unseekable and uses data descriptors."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(documents: List[Dict], manifest: bytes) -> Iterator[bytes]:
+    """Stream a stored (uncompressed) ZIP; PDFs gain little from deflate."""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        zf.writestr(MANIFEST_NAME, manifest)
+        yield sink.drain()
+        for doc in documents:
+            info = zipfile.ZipInfo.from_file(doc["_file"], arcname=doc["path"])
+            info.compress_type = zipfile.ZIP_STORED
+            with zf.open(info, "w", force_zip64=doc["size"] >= zipfile.ZIP64_LIMIT) as entry:
+                with doc["_file"].open("rb") as fh:
+                    for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+                        entry.write(chunk)
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=start-end`` range.
+
+    Returns None when the header is absent or malformed (the full body should
+    be served) and raises ValueError for well-formed but unsatisfiable ranges.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first or last) or any(part and not part.isdigit() for part in (first, last)):
+        return None
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = int(last) if last else size - 1
+    else:
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("range not satisfiable")
+        start = max(size - suffix, 0)
+        end = size - 1
+    if start >= size:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import random
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from loguru import logger
+
+# Failure categories recorded for each document that could not be fetched.
+TIMEOUT = "timeout"
+NO_DOWNLOAD = "no_download"
+NAVIGATION = "navigation"
+AUTH_EXPIRED = "auth_expired"
+
+FAILURE_KINDS = (TIMEOUT, NO_DOWNLOAD, NAVIGATION, AUTH_EXPIRED)
+
+# Dead-letter queue file, kept next to index.csv in the downloads folder.
+DEAD_LETTER_FILE = "failed.json"
+
+
+class DocumentFetchError(Exception):
+    """Raised by the downloader when a single document cannot be fetched."""
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+def classify_error(exc: BaseException) -> str:
+    if isinstance(exc, DocumentFetchError):
+        return exc.kind
+    if isinstance(exc, asyncio.TimeoutError) or "timeout" in type(exc).__name__.lower():
+        return TIMEOUT
+    return NAVIGATION
+
+
+def backoff_delay(attempt: int, base_s: float, max_s: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(max, base * 2**attempt)]."""
+    ceiling = min(max_s, base_s * (2 ** max(attempt, 0)))
+    return random.uniform(0, ceiling)
+
+
+def encode_item(item: Dict) -> Dict:
+    encoded = dict(item)
+    parsed = encoded.get("date_parsed")
+    if isinstance(parsed, date):
+        encoded["date_parsed"] = parsed.isoformat()
+    return encoded
+
+
+def decode_item(item: Dict) -> Dict:
+    decoded = dict(item)
+    parsed = decoded.get("date_parsed")
+    if isinstance(parsed, str) and parsed:
+        try:
+            decoded["date_parsed"] = date.fromisoformat(parsed)
+        except ValueError:
+            decoded["date_parsed"] = None
+    return decoded
+
+
+class DeadLetterQueue:
+    """Documents that kept failing after all retries, persisted as JSON.
+
+    Entries are keyed by detail URL so repeated failures of the same document
+    update a single record instead of piling up duplicates.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._entries: Dict[str, Dict] = {}
+        if self.path.exists():
+            try:
+                for entry in json.loads(self.path.read_text()):
+                    key = entry.get("item", {}).get("href")
+                    if key:
+                        self._entries[key] = entry
+            except Exception as exc:  # pragma: no cover - defensive logging
+                logger.warning(f"Failed to load dead-letter queue at {self.path}: {exc}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def items(self) -> List[Dict]:
+        return [decode_item(entry["item"]) for entry in self._entries.values()]
+
+    def add(self, item: Dict, kind: str, error: str, attempts: int) -> None:
+        key = item.get("href")
+        if not key:
+            return
+        previous = self._entries.get(key, {})
+        self._entries[key] = {
+            "item": encode_item(item),
+            "kind": kind,
+            "error": error,
+            "attempts": previous.get("attempts", 0) + attempts,
+            "last_failed_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def discard(self, item: Dict) -> None:
+        key = item.get("href")
+        if key:
+            self._entries.pop(key, None)
+
+    def save(self) -> None:
+        if not self._entries:
+            if self.path.exists():
+                self.path.unlink()
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(list(self._entries.values()), indent=2))
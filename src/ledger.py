@@ -0,0 +1,219 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .failures import backoff_delay, decode_item, encode_item
+
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    href TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    kind TEXT,
+    error TEXT,
+    file TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (state, lease_expires);
+"""
+
+
+class LeaseLost(RuntimeError):
+    """Raised when a worker reports on an item it no longer holds the lease for."""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class WorkLedger:
+    """Shared SQLite work queue so several workers can split one crawl.
+
+    Every listed document is a row. Workers claim pending rows (or rows whose
+    lease expired because their worker died) inside an immediate transaction,
+    keep the lease alive with heartbeats, and mark rows done or failed. SQLite
+    file locking makes this safe across processes on one host; across hosts
+    the database must live on a filesystem with working POSIX locks.
+    """
+
+    def __init__(self, path: Path, worker_id: Optional[str] = None, lease_s: float = 600):
+        self.path = Path(path)
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_s = lease_s
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self, mode: str = "IMMEDIATE") -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            conn.execute(f"BEGIN {mode}")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def add_items(self, items: List[Dict]) -> int:
+        now = time.time()
+        rows = [
+            (item["href"], json.dumps(encode_item(item)), now)
+            for item in items
+            if item.get("href")
+        ]
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO items (href, payload, updated_at) VALUES (?, ?, ?)", rows
+            )
+            return conn.total_changes - before
+
+    def claim(self, limit: int = 1) -> List[Dict]:
+        """Lease up to ``limit`` items that are pending or whose lease expired."""
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT href, payload FROM items"
+                " WHERE (state = ? OR state = ?) AND lease_expires <= ?"
+                " ORDER BY updated_at, href LIMIT ?",
+                (PENDING, CLAIMED, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE items SET state = ?, worker = ?, lease_expires = ?, updated_at = ? WHERE href = ?",
+                [(CLAIMED, self.worker_id, now + self.lease_s, now, row["href"]) for row in rows],
+            )
+        return [decode_item(json.loads(row["payload"])) for row in rows]
+
+    def next_retry_at(self) -> Optional[float]:
+        """Earliest time an unfinished item becomes claimable, if any.
+
+        Covers pending items in backoff and items claimed by other workers,
+        so live workers wait for a dead worker's lease to expire.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT MIN(lease_expires) AS t FROM items WHERE state IN (?, ?)", (PENDING, CLAIMED)
+            ).fetchone()
+            return row["t"] if row and row["t"] is not None else None
+
+    def heartbeat(self, hrefs: List[str]) -> None:
+        if not hrefs:
+            return
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE items SET lease_expires = ?, updated_at = ?"
+                " WHERE href = ? AND state = ? AND worker = ?",
+                [(now + self.lease_s, now, href, CLAIMED, self.worker_id) for href in hrefs],
+            )
+
+    def complete(
+        self,
+        href: str,
+        file: Optional[str] = None,
+        before_commit: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Mark ``href`` done.
+
+        ``before_commit`` runs while the write lock is held, so it is
+        serialized across workers (used to merge rows into index.csv); if it
+        raises, the item stays claimed and returns to the pool on release.
+        Raises LeaseLost if another worker has since claimed the item.
+        """
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE items SET state = ?, file = ?, lease_expires = 0, error = NULL, updated_at = ?"
+                " WHERE href = ? AND state = ? AND worker = ?",
+                (DONE, file, time.time(), href, CLAIMED, self.worker_id),
+            )
+            if cur.rowcount != 1:
+                raise LeaseLost(href)
+            if before_commit:
+                before_commit()
+
+    def fail(
+        self,
+        href: str,
+        kind: str,
+        error: str,
+        max_attempts: int,
+        backoff_s: float = 0,
+        backoff_max_s: float = 0,
+    ) -> bool:
+        """Record a failed attempt; returns True once the item is given up on.
+
+        Items with attempts left go back to the pool but cannot be claimed
+        again until a jittered exponential backoff has passed. Raises
+        LeaseLost if another worker has since claimed the item.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM items WHERE href = ? AND state = ? AND worker = ?",
+                (href, CLAIMED, self.worker_id),
+            ).fetchone()
+            if row is None:
+                raise LeaseLost(href)
+            attempts = row["attempts"] + 1
+            dead = attempts >= max_attempts
+            not_before = 0 if dead else now + backoff_delay(attempts - 1, backoff_s, backoff_max_s)
+            conn.execute(
+                "UPDATE items SET state = ?, worker = NULL, lease_expires = ?, attempts = ?,"
+                " kind = ?, error = ?, updated_at = ? WHERE href = ?",
+                (FAILED if dead else PENDING, not_before, attempts, kind, error, now, href),
+            )
+        return dead
+
+    def release(self) -> None:
+        """Hand unfinished claims of this worker back to the pool."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE items SET state = ?, worker = NULL, lease_expires = 0, updated_at = ?"
+                " WHERE state = ? AND worker = ?",
+                (PENDING, time.time(), CLAIMED, self.worker_id),
+            )
+
+    def requeue_failed(self) -> int:
+        with self._transaction() as conn:
+            cur = conn.execute(
+                "UPDATE items SET state = ?, attempts = 0, lease_expires = 0, updated_at = ? WHERE state = ?",
+                (PENDING, time.time(), FAILED),
+            )
+            return cur.rowcount
+
+    def items(self, state: str = PENDING) -> List[Dict]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT payload FROM items WHERE state = ? ORDER BY updated_at, href", (state,)
+            ).fetchall()
+        return [decode_item(json.loads(row["payload"])) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            counts = {state: 0 for state in (PENDING, CLAIMED, DONE, FAILED)}
+            for row in conn.execute("SELECT state, COUNT(*) AS n FROM items GROUP BY state"):
+                counts[row["state"]] = row["n"]
+            return counts
@@ -1,13 +1,16 @@
+import sys
+import time
+
+_STARTED = time.perf_counter()
+_STARTED_MODULES = len(sys.modules)
+
 import argparse
 import asyncio
 import getpass
 from pathlib import Path
 from loguru import logger
-from playwright.async_api import TimeoutError as PlaywrightTimeout
 
-from .cdasia import CDAsiaClient
-from .downloader import Downloader
-from .utils import load_config, ensure_dirs
+from .utils import StartupProfiler, load_config, ensure_dirs
 
 def parse_args():
     p = argparse.ArgumentParser("cdasia-opinion-downloader")
@@ -18,6 +21,11 @@ def parse_args():
     p.add_argument("--max-docs", type=int, default=None)
     p.add_argument("--headless", action="store_true")
     p.add_argument("--dry-run", action="store_true")
+    p.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Skip the search and only retry documents recorded in the dead-letter queue",
+    )
     p.add_argument("--username", type=str, default=None, help="CDAsia username (overrides .env)")
     p.add_argument("--password", type=str, default=None, help="CDAsia password (overrides .env; use with caution)")
     p.add_argument(
@@ -25,11 +33,38 @@ def parse_args():
         action="store_true",
         help="Prompt for the CDAsia password interactively instead of reading from .env",
     )
+    p.add_argument(
+        "--ledger",
+        type=str,
+        default=None,
+        help="Shared SQLite work ledger; lets several workers split one crawl without duplicates",
+    )
+    p.add_argument(
+        "--worker-only",
+        action="store_true",
+        help="With --ledger, skip the search and only claim items already listed in the ledger",
+    )
+    p.add_argument("--worker-id", type=str, default=None, help="Worker name recorded in the ledger")
+    p.add_argument(
+        "--check-selectors",
+        action="store_true",
+        help="Check selectors on the login, search, results and detail pages, then exit",
+    )
+    p.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Log import and initialization time per stage once the browser is ready",
+    )
     return p.parse_args()
 
 async def run():
     args = parse_args()
+    profiler = StartupProfiler(
+        enabled=args.profile_startup, started=_STARTED, modules=_STARTED_MODULES
+    )
+    profiler.mark("cli imports + args")
     cfg = load_config()
+    profiler.mark("load_config")
 
     # CLI overrides
     if args.year_from: cfg["filters"]["year_from"] = args.year_from
@@ -38,6 +73,7 @@ async def run():
     if args.keywords: cfg["filters"]["keywords"] = args.keywords
     if args.max_docs is not None: cfg["filters"]["max_docs"] = args.max_docs
     if args.headless: cfg["scrape"]["headless"] = True
+    if args.ledger: cfg["scrape"]["ledger_path"] = args.ledger
 
     downloads_dir = Path(cfg["site"]["downloads_subdir"])
     logs_dir = Path(cfg["site"]["log_dir"])
@@ -45,6 +81,33 @@ async def run():
 
     logger.add(logs_dir / "run.log", rotation="2 MB")
 
+    ledger = None
+    if cfg["scrape"].get("ledger_path"):
+        from .ledger import FAILED, PENDING, WorkLedger
+
+        ledger = WorkLedger(
+            Path(cfg["scrape"]["ledger_path"]),
+            worker_id=args.worker_id,
+            lease_s=cfg["scrape"].get("lease_s", 600),
+        )
+        logger.info(f"Using work ledger {ledger.path} as {ledger.worker_id}: {ledger.stats()}")
+
+    # Dry runs that only read local data never need the browser or a login.
+    if args.dry_run and (args.retry_failed or (ledger and args.worker_only)):
+        if ledger:
+            state = FAILED if args.retry_failed else PENDING
+            items = ledger.items(state)
+            logger.info(f"{len(items)} {state} items in {ledger.path}")
+        else:
+            from .failures import DEAD_LETTER_FILE, DeadLetterQueue
+
+            dead_letters = DeadLetterQueue(downloads_dir / DEAD_LETTER_FILE)
+            items = dead_letters.items()
+            logger.info(f"{len(items)} failed documents recorded in {dead_letters.path}")
+        for r in items:
+            logger.info(f"{r.get('date')} | {r.get('title')} | {r.get('href')}")
+        return
+
     auth_cfg = cfg.get("auth", {}) if isinstance(cfg, dict) else {}
     username = args.username or auth_cfg.get("username")
     password = args.password or auth_cfg.get("password")
@@ -52,7 +115,47 @@ async def run():
     if args.prompt_password:
         password = getpass.getpass("CDAsia password: ")
 
+    # Playwright and pandas are only needed once we actually talk to the portal,
+    # so keep them off the --help / argument-error path.
+    from playwright.async_api import TimeoutError as PlaywrightTimeout
+    profiler.mark("import playwright")
+    from .cdasia import CDAsiaClient
+    from .preflight import PreflightError
+    profiler.mark("import src.cdasia")
+    from .downloader import Downloader
+    profiler.mark("import src.downloader")
+    if profiler.enabled and not (args.dry_run or args.check_selectors):
+        # Downloader imports pandas lazily when it first touches index.csv, which
+        # happens after this report; import it here so its cost is visible.
+        import pandas  # noqa: F401
+        profiler.mark("import pandas")
+
     async with CDAsiaClient(cfg) as client:
+        profiler.mark("launch browser")
+        if profiler.enabled:
+            for line in profiler.report():
+                logger.info(line)
+
+        if args.check_selectors:
+            from .preflight import log_report, run_health_check
+
+            reports = []
+            login_error = None
+            try:
+                await run_health_check(client, username=username, password=password, reports=reports)
+            except PlaywrightTimeout:
+                login_error = "Login validation timed out. Ensure any CAPTCHA or 2FA prompts are completed, then retry."
+            except RuntimeError as exc:
+                login_error = str(exc)
+            for report in reports:
+                log_report(report)
+            if login_error:
+                logger.error(login_error)
+                logger.info("Selector check stopped because login failed.")
+            if login_error or not all(report["ok"] for report in reports):
+                raise SystemExit(1)
+            return
+
         try:
             await client.login(
                 human_checkpoint=True,
@@ -70,13 +173,37 @@ async def run():
             logger.info("Aborting run because login failed.")
             return
 
-        results = await client.search()
-        if args.dry_run:
-            for r in results:
-                logger.info(f"{r['date']} | {r['title']} | {r['href']}")
+        async def reauth():
+            await client.login(human_checkpoint=True, username=username, password=password)
+
+        if args.retry_failed:
+            if ledger:
+                logger.info(f"Requeued {ledger.requeue_failed()} failed ledger items")
+                await Downloader(cfg, downloads_dir).work_ledger(client.page, ledger, reauth)
+            else:
+                await Downloader(cfg, downloads_dir).retry_failed(client.page, reauth)
             return
+
+        if not (ledger and args.worker_only):
+            try:
+                results = await client.search()
+            except PreflightError as exc:
+                logger.error(str(exc))
+                logger.info("Aborting run because the search page no longer matches src/selectors.py.")
+                return
+            if args.dry_run:
+                for r in results:
+                    logger.info(f"{r['date']} | {r['title']} | {r['href']}")
+                return
+            if ledger:
+                added = ledger.add_items(results)
+                logger.info(f"Listed {len(results)} results; {added} new items added to the ledger")
+
         downloader = Downloader(cfg, downloads_dir)
-        await downloader.fetch_all(client.page, results)
+        if ledger:
+            await downloader.work_ledger(client.page, ledger, reauth)
+        else:
+            await downloader.fetch_all(client.page, results, reauth)
 
 if __name__ == "__main__":
     asyncio.run(run())
@@ -0,0 +1,227 @@
+import asyncio
+import difflib
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from loguru import logger
+from playwright.async_api import TimeoutError as PlaywrightTimeout
+
+from .selectors import SEL
+
+# Selectors checked per page type as (SEL key, required). Entries that only
+# appear after interaction (library menu, backdrop) or that are relative to a
+# row (result_ref, ...) are left out; optional ones are reported but never fail.
+PAGE_SELECTORS: Dict[str, List[Tuple[str, bool]]] = {
+    "login": [
+        ("login_user", True),
+        ("login_pass", True),
+        ("login_submit", True),
+    ],
+    "search": [
+        ("search_library_button", True),
+        ("search_section_chip", False),
+        ("search_division_chip", False),
+        ("search_submit", True),
+    ],
+    "results": [
+        ("results_container", True),
+        ("result_row", False),
+        ("pagination_next", False),
+    ],
+    "detail": [
+        ("download_link", True),
+    ],
+}
+
+_HAS_TEXT = re.compile(r"^(?P<css>.*):has-text\('(?P<text>.*)'\)$")
+
+# Runs in the page: counts matches for every check in one round trip and,
+# when asked, collects simple selectors for elements on the page so close
+# matches can be suggested for the ones that failed.
+_PROBE_JS = """
+({checks, suggest}) => {
+    const counts = {};
+    for (const c of checks) {
+        try {
+            const els = Array.from(document.querySelectorAll(c.css));
+            counts[c.key] = c.text
+                ? els.filter(el => (el.textContent || '').includes(c.text)).length
+                : els.length;
+        } catch (e) {
+            counts[c.key] = -1;
+        }
+    }
+    const candidates = new Set();
+    if (suggest) {
+        const els = Array.from(document.querySelectorAll('[id],[name],[aria-label],[type],[class]')).slice(0, 3000);
+        for (const el of els) {
+            const tag = el.tagName.toLowerCase();
+            if (el.id) candidates.add(`#${el.id}`);
+            for (const attr of ['name', 'aria-label', 'type']) {
+                const value = el.getAttribute(attr);
+                if (value) candidates.add(`${tag}[${attr}='${value}']`);
+            }
+            for (const cls of el.classList) candidates.add(`${tag}.${cls}`);
+        }
+    }
+    return {counts, candidates: Array.from(candidates)};
+}
+"""
+
+
+class PreflightError(RuntimeError):
+    """Raised when required selectors are missing from a page."""
+
+    def __init__(self, report: Dict):
+        missing = [s["key"] for s in report["selectors"] if s["required"] and s["matched"] <= 0]
+        super().__init__(
+            f"Selector preflight failed on {report['page']} page; missing: {', '.join(missing)}"
+        )
+        self.report = report
+
+
+def _template_values(cfg: dict) -> Dict[str, Optional[str]]:
+    filters = cfg.get("filters", {})
+    sections = filters.get("sections") or []
+    return {
+        "library": filters.get("library"),
+        "section": sections[0] if sections else None,
+        "division": filters.get("division"),
+    }
+
+
+def selectors_for(page_type: str, cfg: dict) -> List[Dict]:
+    values = _template_values(cfg)
+    checks = []
+    for key, required in PAGE_SELECTORS[page_type]:
+        selector = SEL[key]
+        fields = re.findall(r"{(\w+)}", selector)
+        if any(not values.get(field) for field in fields):
+            continue
+        if key == "search_library_button" and not values["library"]:
+            continue
+        selector = selector.format(**{field: values[field] for field in fields})
+        match = _HAS_TEXT.match(selector)
+        checks.append({
+            "key": key,
+            "selector": selector,
+            "css": match.group("css") if match else selector,
+            "text": match.group("text") if match else None,
+            "required": required,
+        })
+    return checks
+
+
+async def check_page(page, page_type: str, cfg: dict, suggest: bool = True) -> Dict:
+    """Probe every selector for ``page_type`` at once, polling briefly while the page renders."""
+    checks = selectors_for(page_type, cfg)
+    payload = [{"key": c["key"], "css": c["css"], "text": c["text"]} for c in checks]
+    timeout = cfg.get("scrape", {}).get("preflight_timeout_ms", 3000) / 1000
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        probe = await page.evaluate(_PROBE_JS, {"checks": payload, "suggest": False})
+        counts = probe["counts"]
+        missing = [c for c in checks if c["required"] and counts.get(c["key"], 0) <= 0]
+        if not missing or loop.time() >= deadline:
+            break
+        await asyncio.sleep(0.2)
+
+    unmatched = [c for c in checks if counts.get(c["key"], 0) <= 0]
+    candidates: List[str] = []
+    if suggest and unmatched:
+        candidates = (await page.evaluate(_PROBE_JS, {"checks": [], "suggest": True}))["candidates"]
+
+    selectors = []
+    for c in checks:
+        matched = counts.get(c["key"], 0)
+        entry = {
+            "key": c["key"],
+            "selector": c["selector"],
+            "required": c["required"],
+            "matched": matched,
+        }
+        if matched <= 0 and candidates:
+            entry["suggestions"] = difflib.get_close_matches(c["css"], candidates, n=3, cutoff=0.5)
+        selectors.append(entry)
+
+    return {
+        "page": page_type,
+        "url": page.url,
+        "ok": not missing,
+        "selectors": selectors,
+    }
+
+
+def format_report(report: Dict) -> List[str]:
+    lines = [f"Preflight {report['page']} ({report['url']}): {'OK' if report['ok'] else 'FAILED'}"]
+    for entry in report["selectors"]:
+        if entry["matched"] > 0:
+            status = f"ok ({entry['matched']})"
+        elif entry["matched"] < 0:
+            status = "invalid selector"
+        else:
+            status = "MISSING" if entry["required"] else "missing (optional)"
+        line = f"  {entry['key']:<24} {status:<20} {entry['selector']}"
+        if entry.get("suggestions"):
+            line += f"  -> try: {', '.join(entry['suggestions'])}"
+        lines.append(line)
+    return lines
+
+
+def log_report(report: Dict) -> None:
+    log = logger.info if report["ok"] else logger.error
+    for line in format_report(report):
+        log(line)
+
+
+async def run_health_check(
+    client,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    reports: Optional[List[Dict]] = None,
+) -> List[Dict]:
+    """Walk login, search, results and (when linked) detail pages, checking selectors.
+
+    Selector mismatches are reported, not raised. Login errors still propagate;
+    pass ``reports`` to keep the pages checked before the error.
+    """
+    cfg = client.cfg
+    site = cfg["site"]
+    reports = [] if reports is None else reports
+
+    await client.goto(site["base_url"] + site["login_path"])
+    reports.append(await check_page(client.page, "login", cfg))
+    if not reports[-1]["ok"]:
+        return reports
+
+    await client.login(
+        human_checkpoint=not cfg["scrape"].get("headless", True),
+        username=username,
+        password=password,
+        preflight=False,
+    )
+
+    await client.goto(site["base_url"] + site["search_path"])
+    reports.append(await check_page(client.page, "search", cfg))
+    if not reports[-1]["ok"]:
+        return reports
+
+    await client.page.click(SEL["search_submit"])
+    # Searches can legitimately take a while; only the probe afterwards is fast.
+    try:
+        await client.page.wait_for_selector(
+            SEL["results_container"], timeout=cfg["scrape"]["navigation_timeout_ms"]
+        )
+    except PlaywrightTimeout:
+        logger.warning("Results did not appear within the navigation timeout.")
+    reports.append(await check_page(client.page, "results", cfg))
+
+    link = await client.page.query_selector(f"{SEL['result_row']} {SEL['result_title']} a")
+    href = await link.get_attribute("href") if link else None
+    if href:
+        await client.goto(urljoin(client.page.url, href))
+        reports.append(await check_page(client.page, "detail", cfg))
+    return reports
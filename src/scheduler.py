@@ -0,0 +1,169 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+# Starts a run for a job payload and returns (task_id, asyncio task).
+Launcher = Callable[[Any], Tuple[str, "asyncio.Task"]]
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(timespec="seconds") if ts else None
+
+
+class _Job:
+    def __init__(
+        self,
+        name: str,
+        payload: Any,
+        interval_s: float,
+        jitter_s: float,
+        enabled: bool,
+        start_at: Optional[float] = None,
+    ):
+        self.name = name
+        self.payload = payload
+        self.enabled = enabled
+        self.configure(interval_s, jitter_s, start_at)
+        self.active: Optional[asyncio.Task] = None
+        self.active_task_id: Optional[str] = None
+        self.last_task_id: Optional[str] = None
+        self.last_started_at: Optional[float] = None
+        self.last_duration_s: Optional[float] = None
+        self.runs = 0
+        self.coalesced = 0
+
+    def configure(self, interval_s: float, jitter_s: float, start_at: Optional[float] = None) -> None:
+        """Set the nominal schedule: ``start_at`` (default now) plus whole intervals."""
+        self.interval_s = interval_s
+        self.jitter_s = jitter_s
+        now = time.time()
+        self.anchor = start_at if start_at is not None else now
+        if self.anchor < now:
+            self._skip_to(now)
+        self.next_run_at = self.anchor + random.uniform(0, jitter_s)
+
+    def advance(self, now: float) -> None:
+        """Move to the next nominal slot; jitter never shifts the anchor itself."""
+        self.anchor += self.interval_s
+        if self.anchor <= now:
+            # Missed slots (the loop stalled or a run was delayed) are skipped, not replayed.
+            self._skip_to(now)
+            self.anchor += self.interval_s
+        self.next_run_at = self.anchor + random.uniform(0, self.jitter_s)
+
+    def _skip_to(self, now: float) -> None:
+        """Advance the anchor by whole intervals to the last slot not after ``now``."""
+        self.anchor += (now - self.anchor) // self.interval_s * self.interval_s
+
+
+class Scheduler:
+    """In-process scheduler for recurring runs.
+
+    Each job fires at fixed nominal times (its start plus whole intervals),
+    each delayed by a fresh random jitter so several jobs do not log in at the
+    same moment; the jitter never carries over into later runs. A trigger
+    (scheduled or manual) for a job whose previous run is still active is
+    merged into that run instead of starting a second browser session.
+    """
+
+    def __init__(self, launch: Launcher, tick_s: float = 1.0):
+        self.launch = launch
+        self.tick_s = tick_s
+        self.jobs: Dict[str, _Job] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def add(
+        self,
+        name: str,
+        payload: Any,
+        interval_s: float,
+        jitter_s: float = 0,
+        enabled: bool = True,
+        start_at: Optional[float] = None,
+    ) -> None:
+        """Add or replace a job; replacing keeps its run history and any active run.
+
+        The first run is due at ``start_at`` (or now) plus jitter; later runs
+        follow at whole intervals from that anchor.
+        """
+        job = self.jobs.get(name)
+        if job is None:
+            self.jobs[name] = _Job(name, payload, interval_s, jitter_s, enabled, start_at)
+            return
+        job.payload, job.enabled = payload, enabled
+        job.configure(interval_s, jitter_s, start_at)
+
+    def remove(self, name: str) -> bool:
+        return self.jobs.pop(name, None) is not None
+
+    def trigger(self, name: str, reason: str = "manual") -> Tuple[str, bool]:
+        """Start a run of ``name`` unless one is active; returns (task_id, coalesced)."""
+        job = self.jobs[name]
+        if job.active and not job.active.done():
+            job.coalesced += 1
+            logger.info(f"Schedule '{name}' ({reason}) coalesced into running task {job.active_task_id}")
+            return job.active_task_id, True
+
+        task_id, task = self.launch(job.payload)
+        job.active, job.active_task_id = task, task_id
+        job.last_task_id = task_id
+        job.last_started_at = time.time()
+        job.runs += 1
+        logger.info(f"Schedule '{name}' ({reason}) started task {task_id}")
+
+        def _finished(_task, job=job, started=job.last_started_at):
+            job.last_duration_s = time.time() - started
+            if job.active is _task:
+                job.active, job.active_task_id = None, None
+
+        task.add_done_callback(_finished)
+        return task_id, False
+
+    async def _run(self) -> None:
+        while True:
+            now = time.time()
+            for job in list(self.jobs.values()):
+                if not job.enabled or job.next_run_at > now:
+                    continue
+                job.advance(now)
+                try:
+                    self.trigger(job.name, reason="schedule")
+                except Exception as exc:  # pragma: no cover - defensive logging
+                    logger.exception("Schedule {name} failed to start: {exc}", name=job.name, exc=exc)
+            await asyncio.sleep(self.tick_s)
+
+    def start(self) -> None:
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._loop_task:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": job.name,
+                "enabled": job.enabled,
+                "interval_s": job.interval_s,
+                "jitter_s": job.jitter_s,
+                "next_run_at": _iso(job.next_run_at) if job.enabled else None,
+                "running": bool(job.active and not job.active.done()),
+                "active_task_id": job.active_task_id,
+                "last_task_id": job.last_task_id,
+                "last_started_at": _iso(job.last_started_at),
+                "last_duration_s": round(job.last_duration_s, 1) if job.last_duration_s is not None else None,
+                "runs": job.runs,
+                "coalesced": job.coalesced,
+            }
+            for job in self.jobs.values()
+        ]
@@ -0,0 +1,105 @@
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+
+class _Operation:
+    def __init__(self, name: str):
+        self.name = name
+        # Set to False for operations that did no real work (e.g. resume skips)
+        # so they neither skew the latency window nor get saved.
+        self.sampled = True
+
+
+class OutlierTracer:
+    """Keeps a Playwright trace chunk per operation and saves it only for outliers.
+
+    Tracing is started once per browser context; each operation records into a
+    fresh chunk which is discarded on completion unless the operation failed or
+    took longer than the configured percentile of recent latencies.
+    """
+
+    def __init__(self, cfg: dict, out_dir: Path):
+        scrape = cfg.get("scrape", {})
+        self.enabled = bool(scrape.get("trace_outliers"))
+        self.percentile = float(scrape.get("trace_percentile", 95))
+        self.min_samples = int(scrape.get("trace_min_samples", 20))
+        self.max_bytes = int(scrape.get("trace_max_mb", 200)) * 1024 * 1024
+        self.out_dir = out_dir
+        self._durations = deque(maxlen=int(scrape.get("trace_window", 200)))
+        self._started = set()
+
+    def threshold(self) -> Optional[float]:
+        if len(self._durations) < self.min_samples:
+            return None
+        ordered = sorted(self._durations)
+        index = min(len(ordered) - 1, int(round(self.percentile / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    async def _start_chunk(self, context, name: str) -> bool:
+        try:
+            if id(context) not in self._started:
+                await context.tracing.start(screenshots=True, snapshots=True)
+                self._started.add(id(context))
+            await context.tracing.start_chunk(title=name)
+            return True
+        except Exception as exc:
+            logger.warning(f"Could not start trace chunk for {name}: {exc}")
+            return False
+
+    def _trace_path(self, name: str, reason: str) -> Path:
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "-", name).strip("-")[:60] or "operation"
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        return self.out_dir / f"{stamp}-{reason}-{slug}.zip"
+
+    def _enforce_retention(self) -> None:
+        traces = sorted(self.out_dir.glob("*.zip"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in traces)
+        while traces and total > self.max_bytes:
+            oldest = traces.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink(missing_ok=True)
+
+    @asynccontextmanager
+    async def capture(self, context, name: str):
+        op = _Operation(name)
+        if not self.enabled:
+            yield op
+            return
+
+        active = await self._start_chunk(context, name)
+        threshold = self.threshold()
+        started = time.monotonic()
+        failed = False
+        try:
+            yield op
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            slow = op.sampled and threshold is not None and elapsed > threshold
+            if op.sampled and not failed:
+                self._durations.append(elapsed)
+            if active:
+                path = None
+                if failed or slow:
+                    self.out_dir.mkdir(parents=True, exist_ok=True)
+                    path = self._trace_path(name, "failed" if failed else "slow")
+                try:
+                    await context.tracing.stop_chunk(path=str(path) if path else None)
+                except Exception as exc:
+                    logger.warning(f"Could not stop trace chunk for {name}: {exc}")
+                else:
+                    if path:
+                        detail = f"{elapsed:.1f}s" + (
+                            f" (p{self.percentile:g}={threshold:.1f}s)" if threshold is not None else ""
+                        )
+                        logger.warning(f"Saved trace for {name} after {detail}: {path}")
+                        self._enforce_retention()
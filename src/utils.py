@@ -1,5 +1,7 @@
+import sys
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
 import yaml
 
@@ -26,7 +28,18 @@ _DEFAULT_CFG = {
         "batch_size": 5,
         "download_timeout_ms": 120000,
         "retries": 3,
+        "retry_backoff_ms": 2000,
+        "retry_backoff_max_ms": 60000,
         "resume": True,
+        "preflight": True,
+        "preflight_timeout_ms": 3000,
+        "trace_outliers": False,
+        "trace_percentile": 95,
+        "trace_min_samples": 20,
+        "trace_window": 200,
+        "trace_max_mb": 200,
+        "ledger_path": None,
+        "lease_s": 600,
         "user_agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118 Safari/537.36",
     }
 }
@@ -57,3 +70,37 @@ def save_config(cfg: Dict[str, Any], path: Path | str = "config.yaml") -> None:
 def ensure_dirs(paths):
     for p in paths:
         Path(p).mkdir(parents=True, exist_ok=True)
+
+
+class StartupProfiler:
+    """Records wall time and newly imported modules between successive marks."""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        started: Optional[float] = None,
+        modules: Optional[int] = None,
+    ):
+        self.enabled = enabled
+        self._last = started if started is not None else time.perf_counter()
+        self._started = self._last
+        self._modules = modules if modules is not None else len(sys.modules)
+        self._start_modules = self._modules
+        self.stages: List[Tuple[str, float, int]] = []
+
+    def mark(self, name: str) -> None:
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        modules = len(sys.modules)
+        self.stages.append((name, now - self._last, modules - self._modules))
+        self._last, self._modules = now, modules
+
+    def report(self) -> List[str]:
+        lines = [f"{'stage':<28} {'ms':>9} {'new modules':>12}"]
+        for name, elapsed, modules in self.stages:
+            lines.append(f"{name:<28} {elapsed * 1000:>9.1f} {modules:>12}")
+        total = self._last - self._started
+        loaded = self._modules - self._start_modules
+        lines.append(f"{'total':<28} {total * 1000:>9.1f} {loaded:>12}")
+        return lines
@@ -1,19 +1,30 @@
 import asyncio
 import uuid
+from contextlib import asynccontextmanager
+from datetime import date, datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from loguru import logger
 from pydantic import BaseModel, Field, field_validator, model_validator
 
-from .cdasia import CDAsiaClient
-from .downloader import Downloader
+from .scheduler import Scheduler
 from .utils import ensure_dirs, load_config
 
 
-app = FastAPI(title="CDAsia Opinions Downloader", version="0.1.0")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    _load_schedules(load_config())
+    SCHEDULER.start()
+    try:
+        yield
+    finally:
+        await SCHEDULER.stop()
+
+
+app = FastAPI(title="CDAsia Opinions Downloader", version="0.1.0", lifespan=lifespan)
 
 
 class RunRequest(BaseModel):
@@ -24,6 +35,7 @@ class RunRequest(BaseModel):
     max_docs: Optional[int] = Field(None, ge=0)
     headless: Optional[bool] = None
     dry_run: bool = False
+    retry_failed: bool = False
 
     @field_validator("keywords", mode="before")
     @classmethod
@@ -42,6 +54,15 @@ class RunRequest(BaseModel):
             raise ValueError("year_to must be >= year_from")
         return self
 
+class ScheduleRequest(BaseModel):
+    name: str = Field(..., min_length=1)
+    interval_minutes: float = Field(..., gt=0)
+    jitter_seconds: float = Field(60, ge=0)
+    enabled: bool = True
+    start_at: Optional[datetime] = None
+    run: RunRequest = Field(default_factory=RunRequest)
+
+
 TASKS: Dict[str, Dict[str, Any]] = {}
 
 
@@ -65,6 +86,10 @@ def _apply_overrides(cfg: Dict[str, Any], payload: RunRequest) -> Dict[str, Any]
 
 
 async def _download_job(task_id: str, payload: RunRequest) -> None:
+    # Imported per job so serving the UI and API does not load Playwright/pandas.
+    from .cdasia import CDAsiaClient
+    from .downloader import Downloader
+
     info = TASKS[task_id]
     loop = asyncio.get_running_loop()
     info.update({
@@ -82,8 +107,33 @@ async def _download_job(task_id: str, payload: RunRequest) -> None:
     log_sink_id = logger.add(log_path, rotation="2 MB")
 
     try:
+        if payload.retry_failed and payload.dry_run:
+            from .failures import DEAD_LETTER_FILE, DeadLetterQueue
+
+            items = DeadLetterQueue(downloads_dir / DEAD_LETTER_FILE).items()
+            info["results_found"] = len(items)
+            info["preview"] = [
+                {"title": entry.get("title"), "date": entry.get("date"), "href": entry.get("href")}
+                for entry in items[:10]
+            ]
+            info["status"] = "completed"
+            return
+
         async with CDAsiaClient(cfg) as client:
-            await client.login(human_checkpoint=not cfg["scrape"].get("headless", True))
+            human_checkpoint = not cfg["scrape"].get("headless", True)
+            await client.login(human_checkpoint=human_checkpoint)
+
+            async def reauth():
+                await client.login(human_checkpoint=human_checkpoint)
+
+            if payload.retry_failed:
+                downloader = Downloader(cfg, downloads_dir)
+                await downloader.retry_failed(client.page, reauth)
+                info["downloaded"] = len(downloader.index_rows)
+                info["failed"] = len(downloader.failures)
+                info["status"] = "completed"
+                return
+
             results = await client.search()
             info["results_found"] = len(results)
 
@@ -100,8 +150,9 @@ async def _download_job(task_id: str, payload: RunRequest) -> None:
                 return
 
             downloader = Downloader(cfg, downloads_dir)
-            await downloader.fetch_all(client.page, results)
+            await downloader.fetch_all(client.page, results, reauth)
             info["downloaded"] = len(downloader.index_rows)
+            info["failed"] = len(downloader.failures)
             info["status"] = "completed"
     except Exception as exc:  # pragma: no cover - defensive logging
         info["status"] = "failed"
@@ -162,6 +213,7 @@ async def index() -> str:
             </label>
             <label class='checkbox'><input type='checkbox' name='headless' {headless_checked}> Run headless</label>
             <label class='checkbox'><input type='checkbox' name='dry_run'> Dry run (list only)</label>
+            <label class='checkbox'><input type='checkbox' name='retry_failed'> Retry previously failed documents only</label>
             <button type='submit'>Start run</button>
         </form>
         <section>
@@ -203,6 +255,7 @@ async def index() -> str:
                     `Status: ${task.status}`,
                     task.results_found !== undefined ? `Results found: ${task.results_found}` : '',
                     task.downloaded !== undefined ? `Downloaded: ${task.downloaded}` : '',
+                    task.failed ? `Failed (see failed.json): ${{task.failed}}` : '',
                     task.error ? `Error: ${task.error}` : '',
                     task.log_path ? `Log file: ${task.log_path}` : ''
                 ].filter(Boolean);
@@ -236,10 +289,10 @@ async def index() -> str:
                 const data = new FormData(form);
                 const payload = {{}};
                 for (const [key, value] of data.entries()) {{
-                    if (!value && key !== 'headless' && key !== 'dry_run') continue;
+                    if (!value && key !== 'headless' && key !== 'dry_run' && key !== 'retry_failed') continue;
                     if (key === 'keywords') {{
                         payload[key] = value.split(',').map(v => v.trim()).filter(Boolean);
-                    }} else if (key === 'headless' || key === 'dry_run') {{
+                    }} else if (key === 'headless' || key === 'dry_run' || key === 'retry_failed') {{
                         payload[key] = true;
                     }} else if (key === 'max_docs' || key.startsWith('year')) {{
                         payload[key] = Number(value);
@@ -296,14 +349,160 @@ async def get_task(task_id: str) -> Dict[str, Any]:
     return data
 
 
-@app.post("/api/run")
-async def start_run(payload: RunRequest) -> Dict[str, str]:
+def _launch_run(payload: RunRequest) -> Tuple[str, asyncio.Task]:
     task_id = str(uuid.uuid4())
     TASKS[task_id] = {"status": "pending"}
-    asyncio.create_task(_download_job(task_id, payload))
+    task = asyncio.create_task(_download_job(task_id, payload))
+    return task_id, task
+
+
+SCHEDULER = Scheduler(_launch_run)
+
+
+def _add_schedule(job: ScheduleRequest) -> None:
+    SCHEDULER.add(
+        job.name,
+        job.run,
+        interval_s=job.interval_minutes * 60,
+        jitter_s=job.jitter_seconds,
+        enabled=job.enabled,
+        start_at=job.start_at.timestamp() if job.start_at else None,
+    )
+
+
+def _load_schedules(cfg: Dict[str, Any]) -> None:
+    for entry in cfg.get("schedules") or []:
+        try:
+            _add_schedule(ScheduleRequest.model_validate(entry))
+        except ValueError as exc:
+            logger.error(f"Ignoring invalid schedule {entry!r}: {exc}")
+
+
+def _schedule_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    last_task = TASKS.get(job["last_task_id"] or "", {})
+    return {**job, "last_status": last_task.get("status")}
+
+
+@app.post("/api/run")
+async def start_run(payload: RunRequest) -> Dict[str, str]:
+    task_id, _ = _launch_run(payload)
     return {"task_id": task_id}
 
 
+@app.get("/api/schedules")
+async def list_schedules() -> List[Dict[str, Any]]:
+    return [_schedule_view(job) for job in SCHEDULER.snapshot()]
+
+
+@app.post("/api/schedules")
+async def put_schedule(job: ScheduleRequest) -> Dict[str, Any]:
+    _add_schedule(job)
+    return next(_schedule_view(j) for j in SCHEDULER.snapshot() if j["name"] == job.name)
+
+
+@app.delete("/api/schedules/{name}")
+async def delete_schedule(name: str) -> Dict[str, str]:
+    if not SCHEDULER.remove(name):
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return {"status": "deleted"}
+
+
+@app.post("/api/schedules/{name}/trigger")
+async def trigger_schedule(name: str) -> Dict[str, Any]:
+    if name not in SCHEDULER.jobs:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    task_id, coalesced = SCHEDULER.trigger(name)
+    return {"task_id": task_id, "coalesced": coalesced}
+
+
+@app.get("/api/preflight")
+async def preflight() -> Dict[str, Any]:
+    """Log in headless and report which selectors still match each portal page."""
+    from .cdasia import CDAsiaClient
+    from .preflight import run_health_check
+
+    cfg = load_config()
+    cfg.setdefault("scrape", {})["headless"] = True
+    reports: List[Dict[str, Any]] = []
+    try:
+        async with CDAsiaClient(cfg) as client:
+            await run_health_check(client, reports=reports)
+    except Exception as exc:
+        # Keep the pages checked before the failure (usually login) in the response.
+        logger.exception("Selector preflight failed: {exc}", exc=exc)
+        return JSONResponse(
+            status_code=502,
+            content={"ok": False, "error": f"Preflight could not complete: {exc}", "pages": reports},
+        )
+    return {"ok": all(report["ok"] for report in reports), "pages": reports}
+
+
+def _split_param(value: Optional[str]) -> Optional[List[str]]:
+    if not value:
+        return None
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+@app.get("/api/export")
+def export_archive(
+    request: Request,
+    format: str = Query("zip", pattern="^(zip|tar)$"),
+    years: Optional[str] = Query(None, description="Comma separated, e.g. 2019,2020"),
+    division: Optional[str] = None,
+    references: Optional[str] = Query(None, description="Comma separated reference numbers"),
+    since: Optional[date] = Query(None, description="Only documents added on or after this date"),
+) -> StreamingResponse:
+    """Stream downloaded documents plus a manifest.csv as a ZIP or tar archive.
+
+    Tar exports have a fixed layout and honour ``Range``/``If-Range`` so large
+    transfers can be resumed; ZIP exports are streamed in one pass.
+    """
+    from .export import TarExport, build_manifest, parse_range, select_documents, stream_zip
+
+    cfg = load_config()
+    documents = select_documents(
+        Path(cfg["site"]["downloads_subdir"]),
+        years=_split_param(years),
+        division=division,
+        references=_split_param(references),
+        since=since,
+    )
+    if not documents:
+        raise HTTPException(status_code=404, detail="No downloaded documents match the filters")
+    manifest = build_manifest(documents)
+    filename = f"opinions-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    if format == "zip":
+        return StreamingResponse(stream_zip(documents, manifest), media_type="application/zip", headers=headers)
+
+    archive = TarExport(documents, manifest)
+    headers.update({"Accept-Ranges": "bytes", "ETag": archive.etag})
+    if_range = request.headers.get("if-range")
+    byte_range = None
+    if not if_range or if_range == archive.etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), archive.size)
+        except ValueError:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{archive.size}"},
+            )
+    if byte_range is None:
+        headers["Content-Length"] = str(archive.size)
+        return StreamingResponse(archive.stream(), media_type="application/x-tar", headers=headers)
+
+    start, end = byte_range
+    headers.update({
+        "Content-Range": f"bytes {start}-{end}/{archive.size}",
+        "Content-Length": str(end - start + 1),
+    })
+    return StreamingResponse(
+        archive.stream(start, end), status_code=206, media_type="application/x-tar", headers=headers
+    )
+
+
 @app.get("/healthz")
 async def healthcheck() -> Dict[str, str]:
     return {"status": "ok"}